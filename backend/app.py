@@ -1,31 +1,25 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from neo4j import READ_ACCESS
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 from typing import Dict, List
 
+import cache
 from config import Config
-from fetch_github import fetch_user_data
+from fetch_github import RateLimitExceeded, fetch_user_data
+import neo4j_import
 from neo4j_import import Neo4jImporter, import_github_user
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-
-# Configure CORS for production
-if Config.FLASK_ENV == 'production':
-    # In production, allow requests from the Render frontend domain
-    CORS(app, origins=[
-        "https://*.onrender.com",
-        "https://github-analyzer-frontend.onrender.com"
-    ])
-else:
-    # In development, allow all origins
-    CORS(app)
-
 # Validate configuration on startup
 try:
     Config.validate_config()
@@ -33,107 +27,160 @@ try:
 except Exception as e:
     logger.error(f"Configuration validation failed: {e}")
 
-@app.route('/', methods=['GET'])
-def health_check():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create schema constraints once at startup so per-request imports
+    # skip the schema round-trips entirely
+    try:
+        async with Neo4jImporter() as importer:
+            await importer.create_constraints()
+    except Exception as e:
+        logger.warning(f"Could not create Neo4j constraints at startup: {e}")
+    yield
+    # Release the shared Bolt connection pool on shutdown
+    await neo4j_import.close_driver()
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="GitHub Neo4j Analyzer API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+# Compress larger responses; the graph and language payloads are mostly
+# repeated JSON keys and shrink well
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Configure CORS for production
+if Config.FLASK_ENV == 'production':
+    # In production, allow requests from the Render frontend domain
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://github-analyzer-frontend.onrender.com"],
+        allow_origin_regex=r"https://.*\.onrender\.com",
+        allow_methods=["*"],
+        allow_headers=["*"]
+    )
+else:
+    # In development, allow all origins
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"]
+    )
+
+@app.get('/')
+async def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return ORJSONResponse({
         'status': 'healthy',
         'service': 'GitHub Neo4j Analyzer API',
         'version': '1.0.0'
     })
 
-@app.route('/api/analyze/<username>', methods=['POST'])
-def analyze_user(username: str):
+@app.post('/api/analyze/{username}')
+async def analyze_user(username: str):
     """Analyze a GitHub user and store data in Neo4j"""
     try:
         logger.info(f"Starting analysis for user: {username}")
-        
-        # Fetch GitHub data
-        github_data = fetch_user_data(username)
-        
-        # Import to Neo4j
-        import_github_user(username, github_data)
-        
-        # Get processed stats from Neo4j
-        with Neo4jImporter() as importer:
-            stats = importer.get_user_stats(username)
-            top_repos = importer.get_top_repositories(username, limit=10)
-        
+
+        # Fetch GitHub data (blocking HTTP client, so run off the event loop)
+        github_data = await asyncio.to_thread(fetch_user_data, username)
+
+        # Import to Neo4j; the import transaction returns the stats and
+        # top repositories directly, so no follow-up reads are needed
+        result = await import_github_user(username, github_data)
+
+        # Drop cached responses that are now stale
+        await cache.invalidate_user(username)
+
         response = {
             'success': True,
             'message': f'Successfully analyzed user: {username}',
-            'data': {
-                'user_stats': stats,
-                'top_repositories': top_repos
-            }
+            'data': result
         }
-        
+
         logger.info(f"Analysis completed for user: {username}")
-        return jsonify(response)
-        
+        return ORJSONResponse(response)
+
+    except RateLimitExceeded:
+        # Handled by the dedicated 429 handler instead of a blanket 400
+        raise
+
     except Exception as e:
         logger.error(f"Analysis failed for user {username}: {e}")
-        return jsonify({
+        return ORJSONResponse({
             'success': False,
             'error': str(e)
-        }), 400
+        }, status_code=400)
 
-@app.route('/api/user/<username>/stats', methods=['GET'])
-def get_user_stats(username: str):
+@app.get('/api/user/{username}/stats')
+async def get_user_stats(username: str):
     """Get user statistics from Neo4j"""
     try:
-        with Neo4jImporter() as importer:
-            stats = importer.get_user_stats(username)
-            
+        async def load_stats():
+            async with Neo4jImporter() as importer:
+                stats = await importer.get_user_stats(username)
+
             if not stats:
-                return jsonify({
-                    'success': False,
-                    'error': f'No data found for user: {username}'
-                }), 404
-            
-            return jsonify({
+                return None
+
+            return {
                 'success': True,
                 'data': stats
-            })
-            
+            }
+
+        body = await cache.get_or_set(f"stats:{username}", cache.RESPONSE_TTL, load_stats)
+
+        if body is None:
+            return ORJSONResponse({
+                'success': False,
+                'error': f'No data found for user: {username}'
+            }, status_code=404)
+
+        return Response(content=body, media_type='application/json')
+
     except Exception as e:
         logger.error(f"Failed to get stats for user {username}: {e}")
-        return jsonify({
+        return ORJSONResponse({
             'success': False,
             'error': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.route('/api/user/<username>/repositories', methods=['GET'])
-def get_user_repositories(username: str):
+@app.get('/api/user/{username}/repositories')
+async def get_user_repositories(username: str, limit: int = 50):
     """Get user repositories from Neo4j"""
     try:
-        limit = request.args.get('limit', 50, type=int)
-        
-        with Neo4jImporter() as importer:
-            repos = importer.get_top_repositories(username, limit)
-            
-            return jsonify({
+        async def load_repositories():
+            async with Neo4jImporter() as importer:
+                repos = await importer.get_top_repositories(username, limit)
+
+            return {
                 'success': True,
                 'data': {
                     'repositories': repos,
                     'count': len(repos)
                 }
-            })
-            
+            }
+
+        body = await cache.get_or_set(f"repos:{username}:{limit}", cache.RESPONSE_TTL, load_repositories)
+        return Response(content=body, media_type='application/json')
+
     except Exception as e:
         logger.error(f"Failed to get repositories for user {username}: {e}")
-        return jsonify({
+        return ORJSONResponse({
             'success': False,
             'error': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.route('/api/languages/popular', methods=['GET'])
-def get_popular_languages():
+@app.get('/api/languages/popular')
+async def get_popular_languages():
     """Get most popular programming languages across all users"""
     try:
         query = """
         MATCH (l:Language)<-[rel:USES_LANGUAGE]-(r:Repo)
-        WITH l.name as language, 
+        WITH l.name as language,
              count(r) as repo_count,
              sum(rel.bytes) as total_bytes,
              avg(rel.percentage) as avg_percentage
@@ -141,86 +188,125 @@ def get_popular_languages():
         LIMIT 20
         RETURN language, repo_count, total_bytes, avg_percentage
         """
-        
-        with Neo4jImporter() as importer:
-            with importer.driver.session() as session:
-                result = session.run(query)
-                languages = [record.data() for record in result]
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'popular_languages': languages
+
+        async def load_languages():
+            async def read(tx):
+                result = await tx.run(query)
+                return [record.data() async for record in result]
+
+            importer = Neo4jImporter()
+            async with importer.driver.session(default_access_mode=READ_ACCESS) as session:
+                languages = await session.execute_read(read)
+
+            return {
+                'success': True,
+                'data': {
+                    'popular_languages': languages
+                }
             }
-        })
-        
+
+        body = await cache.get_or_set("languages:popular", cache.RESPONSE_TTL, load_languages)
+        return Response(content=body, media_type='application/json')
+
     except Exception as e:
         logger.error(f"Failed to get popular languages: {e}")
-        return jsonify({
+        return ORJSONResponse({
             'success': False,
             'error': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.route('/api/network/graph/<username>', methods=['GET'])
-def get_user_network_graph(username: str):
+@app.get('/api/network/graph/{username}')
+async def get_user_network_graph(username: str):
     """Get graph data for visualization"""
     try:
+        # Each CALL {} subquery collects only the rows it needs, instead of
+        # every collect() iterating the full (repo x language) match
         query = """
-        MATCH (u:User {login: $username})-[:OWNS]->(r:Repo)-[rel:USES_LANGUAGE]->(l:Language)
-        
-        WITH u, r, l, rel
-        
+        MATCH (u:User {login: $username})
+        CALL {
+            WITH u
+            MATCH (u)-[:OWNS]->(r:Repo)
+            RETURN collect({id: r.full_name, label: r.name, type: 'repo', stars: r.stars}) AS repo_nodes,
+                   collect({source: u.login, target: r.full_name, type: 'owns'}) AS owns_edges
+        }
+        CALL {
+            WITH u
+            MATCH (u)-[:OWNS]->(r:Repo)-[rel:USES_LANGUAGE]->(l:Language)
+            RETURN collect(DISTINCT {id: l.name, label: l.name, type: 'language'}) AS lang_nodes,
+                   collect({source: r.full_name, target: l.name, type: 'uses', weight: rel.percentage}) AS uses_edges
+        }
         RETURN {
-            nodes: collect(DISTINCT {id: u.login, label: u.login, type: 'user'}) +
-                   collect(DISTINCT {id: r.full_name, label: r.name, type: 'repo', stars: r.stars}) +
-                   collect(DISTINCT {id: l.name, label: l.name, type: 'language'}),
-            
-            edges: collect(DISTINCT {source: u.login, target: r.full_name, type: 'owns'}) +
-                   collect(DISTINCT {source: r.full_name, target: l.name, type: 'uses', weight: rel.percentage})
+            nodes: [{id: u.login, label: u.login, type: 'user'}] + repo_nodes + lang_nodes,
+            edges: owns_edges + uses_edges
         } AS graph
         """
-        
-        with Neo4jImporter() as importer:
-            with importer.driver.session() as session:
-                result = session.run(query, username=username)
-                record = result.single()
-                
-                if not record:
-                    return jsonify({
-                        'success': False,
-                        'error': f'No graph data found for user: {username}'
-                    }), 404
-                
-                return jsonify({
-                    'success': True,
-                    'data': record['graph']
-                })
-        
+
+        async def load_graph():
+            async def read(tx):
+                result = await tx.run(query, username=username)
+                return await result.single()
+
+            importer = Neo4jImporter()
+            async with importer.driver.session(default_access_mode=READ_ACCESS) as session:
+                record = await session.execute_read(read)
+
+            if not record:
+                return None
+
+            return {
+                'success': True,
+                'data': record['graph']
+            }
+
+        body = await cache.get_or_set(f"graph:{username}", cache.RESPONSE_TTL, load_graph)
+
+        if body is None:
+            return ORJSONResponse({
+                'success': False,
+                'error': f'No graph data found for user: {username}'
+            }, status_code=404)
+
+        return Response(content=body, media_type='application/json')
+
     except Exception as e:
         logger.error(f"Failed to get graph data for user {username}: {e}")
-        return jsonify({
+        return ORJSONResponse({
             'success': False,
             'error': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
+    return ORJSONResponse({
         'success': False,
-        'error': 'Endpoint not found'
-    }), 404
+        'error': str(exc)
+    }, status_code=429, headers={'Retry-After': str(exc.retry_after)})
 
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    if exc.status_code == 404:
+        return ORJSONResponse({
+            'success': False,
+            'error': 'Endpoint not found'
+        }, status_code=404)
+    return ORJSONResponse({
+        'success': False,
+        'error': str(exc.detail)
+    }, status_code=exc.status_code)
+
+@app.exception_handler(Exception)
+async def internal_error_handler(request: Request, exc: Exception):
+    return ORJSONResponse({
         'success': False,
         'error': 'Internal server error'
-    }), 500
+    }, status_code=500)
 
 if __name__ == '__main__':
+    import uvicorn
+
     port = int(os.environ.get('PORT', 5000))
-    app.run(
-        debug=Config.FLASK_DEBUG,
+    uvicorn.run(
+        app,
         host='0.0.0.0',
         port=port
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,77 @@
+"""Redis read-through cache for computed API responses
+
+Read endpoints serve data that only changes when an analysis runs, so
+their serialized responses are cached with a TTL and invalidated after a
+successful import. Caching activates only when REDIS_URL is configured
+and degrades to running the loader directly if Redis errors.
+"""
+
+import logging
+from typing import Awaitable, Callable, Optional
+
+import orjson
+import redis.asyncio as redis
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Default lifetime for cached endpoint responses
+RESPONSE_TTL = 300
+
+_REDIS_POOL = (
+    redis.ConnectionPool.from_url(Config.REDIS_URL)
+    if Config.REDIS_URL else None
+)
+
+def get_cache() -> Optional[redis.Redis]:
+    """Return a Redis client backed by the shared pool, or None if unconfigured"""
+    if _REDIS_POOL is None:
+        return None
+    return redis.Redis(connection_pool=_REDIS_POOL)
+
+async def get_or_set(key: str, ttl: int, loader: Callable[[], Awaitable]) -> Optional[bytes]:
+    """Return the cached response body for key, running loader on a miss
+
+    The loader's result is serialized with orjson and stored under key for
+    ttl seconds. Returns None (and caches nothing) when the loader itself
+    returns None, so callers can map that to a 404.
+    """
+    client = get_cache()
+
+    if client is not None:
+        try:
+            cached = await client.get(key)
+            if cached is not None:
+                return cached
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, skipping cache: {e}")
+            client = None
+
+    value = await loader()
+    if value is None:
+        return None
+
+    body = orjson.dumps(value)
+
+    if client is not None:
+        try:
+            await client.set(key, body, ex=ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, response not cached: {e}")
+
+    return body
+
+async def invalidate_user(username: str) -> None:
+    """Drop all cached responses that depend on a user's imported data"""
+    client = get_cache()
+    if client is None:
+        return
+
+    try:
+        keys = [f"stats:{username}", f"graph:{username}", "languages:popular"]
+        async for key in client.scan_iter(match=f"repos:{username}:*"):
+            keys.append(key)
+        await client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, cache not invalidated: {e}")
@@ -15,6 +15,9 @@ class Config:
     NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
     NEO4J_USERNAME = os.getenv('NEO4J_USERNAME', 'neo4j')
     NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'password')
+
+    # Redis Configuration (optional; caching is disabled when unset)
+    REDIS_URL = os.getenv('REDIS_URL')
     
     # Flask Configuration
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
@@ -1,39 +1,165 @@
+import json
+import re
+import redis
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional
 from config import Config
 
+# Worker count for concurrent per-repo language fetches
+MAX_FETCH_WORKERS = 16
+
+# Cache lifetimes: raw responses are kept a day (revalidated via ETag on
+# every hit, and 304s are free rate-limit-wise), the assembled user dict
+# only briefly so repeat analyses skip even the conditional requests
+RESPONSE_CACHE_TTL = 86400
+USER_CACHE_TTL = 600
+
+_REDIS_POOL = (
+    redis.ConnectionPool.from_url(Config.REDIS_URL, decode_responses=True)
+    if Config.REDIS_URL else None
+)
+
+def get_cache() -> Optional[redis.Redis]:
+    """Return a Redis client backed by the shared pool, or None if unconfigured"""
+    if _REDIS_POOL is None:
+        return None
+    return redis.Redis(connection_pool=_REDIS_POOL)
+
+class RateLimitExceeded(Exception):
+    """Raised when the GitHub API rate-limit budget is exhausted"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(retry_after))
+        super().__init__(
+            f"GitHub API rate limit exceeded; retry in {self.retry_after} seconds"
+        )
+
 class GitHubAPIClient:
-    """GitHub API client for fetching user and repository data"""
-    
+    """GitHub API client for fetching user and repository data
+
+    The client tracks the rate-limit budget from response headers and
+    refuses to issue requests once it is spent, instead of blocking a
+    worker until the reset; callers surface this to clients as a 429.
+    """
+
     def __init__(self):
         self.base_url = Config.GITHUB_API_BASE_URL
         self.headers = {
             'Accept': 'application/vnd.github.v3+json',
             'User-Agent': 'GitHub-Neo4j-Analyzer/1.0'
         }
-        
+
         if Config.GITHUB_TOKEN:
             self.headers['Authorization'] = f'token {Config.GITHUB_TOKEN}'
-    
+
+        # Shared session: keep-alive connections are reused across threads
+        # instead of paying a TCP/TLS handshake per request. Transient
+        # gateway errors are retried with backoff at the adapter level.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=[502, 503, 504],
+                respect_retry_after_header=True
+            )
+        )
+        self.session.mount('https://', adapter)
+
+        self.cache = get_cache()
+
+        # Rate-limit budget, seeded lazily from response headers and
+        # shared across the fetch threads
+        self._rate_lock = threading.Lock()
+        self._remaining = None
+        self._reset = 0.0
+
+    def _check_rate_budget(self):
+        """Refuse to issue a request when the rate-limit budget is spent"""
+        with self._rate_lock:
+            if (self._remaining is not None and self._remaining <= 0
+                    and time.time() < self._reset):
+                raise RateLimitExceeded(retry_after=self._reset - time.time())
+
+    def _update_rate_budget(self, response: requests.Response):
+        """Record the remaining budget from a response's rate-limit headers"""
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+
+        if remaining is None or reset is None:
+            return
+
+        with self._rate_lock:
+            self._remaining = int(remaining)
+            self._reset = float(reset)
+
+    def _raise_if_rate_limited(self, response: requests.Response):
+        """Translate an exhausted-budget 403 into RateLimitExceeded"""
+        if response.status_code == 403 and response.headers.get('X-RateLimit-Remaining') == '0':
+            reset_time = float(response.headers.get('X-RateLimit-Reset', time.time() + 60))
+            raise RateLimitExceeded(retry_after=reset_time - time.time())
+
+    @staticmethod
+    def _cache_key(url: str, params: Optional[Dict] = None) -> str:
+        """Build the Redis key for a GitHub URL (+ query params)"""
+        if params:
+            return f"gh:{url}?{urlencode(sorted(params.items()))}"
+        return f"gh:{url}"
+
     def _make_request(self, url: str, params: Optional[Dict] = None) -> Dict:
-        """Make a request to the GitHub API with error handling and rate limiting"""
+        """Make a request to the GitHub API with error handling and rate limiting
+
+        Responses are cached in Redis keyed by URL together with their ETag;
+        on a hit the request goes out conditionally and a 304 replays the
+        cached body without spending any rate-limit budget.
+        """
+        cache_key = self._cache_key(url, params)
+        cached = None
+
+        headers = {}
+        if self.cache is not None:
+            try:
+                cached = self.cache.hgetall(cache_key)
+            except redis.RedisError as e:
+                print(f"Warning: Redis unavailable, skipping cache: {e}")
+                cached = None
+
+            if cached and cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+
+        self._check_rate_budget()
+
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            
-            # Handle rate limiting
-            if response.status_code == 403 and 'rate limit' in response.text.lower():
-                reset_time = int(response.headers.get('X-RateLimit-Reset', 0))
-                current_time = int(time.time())
-                sleep_time = max(0, reset_time - current_time + 1)
-                
-                print(f"Rate limit exceeded. Sleeping for {sleep_time} seconds...")
-                time.sleep(sleep_time)
-                return self._make_request(url, params)
-            
+            response = self.session.get(url, params=params, headers=headers)
+            self._update_rate_budget(response)
+
+            if response.status_code == 304 and cached:
+                return json.loads(cached['body'])
+
+            self._raise_if_rate_limited(response)
             response.raise_for_status()
+
+            if self.cache is not None and response.headers.get('ETag'):
+                try:
+                    self.cache.hset(cache_key, mapping={
+                        'etag': response.headers['ETag'],
+                        'body': response.text
+                    })
+                    self.cache.expire(cache_key, RESPONSE_CACHE_TTL)
+                except redis.RedisError as e:
+                    print(f"Warning: Redis unavailable, response not cached: {e}")
+
             return response.json()
-            
+
         except requests.exceptions.RequestException as e:
             raise Exception(f"GitHub API request failed: {str(e)}")
     
@@ -63,25 +189,55 @@ class GitHubAPIClient:
                 raise Exception(f"User '{username}' not found")
             raise e
     
+    def _make_request_raw(self, url: str, params: Optional[Dict] = None) -> requests.Response:
+        """Make a request and return the raw response, headers included"""
+        self._check_rate_budget()
+
+        try:
+            response = self.session.get(url, params=params)
+            self._update_rate_budget(response)
+
+            self._raise_if_rate_limited(response)
+            response.raise_for_status()
+            return response
+
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"GitHub API request failed: {str(e)}")
+
+    @staticmethod
+    def _last_page(link_header: str) -> int:
+        """Parse the page count out of a Link header's rel="last" entry"""
+        match = re.search(r'[?&]page=(\d+)[^>]*>;\s*rel="last"', link_header)
+        return int(match.group(1)) if match else 1
+
     def get_user_repositories(self, username: str, per_page: int = 100) -> List[Dict]:
-        """Fetch all public repositories for a user"""
+        """Fetch all public repositories for a user
+
+        The first page's Link header tells us how many pages exist, so
+        pages 2..last are fetched concurrently instead of one round-trip
+        after another.
+        """
+        url = f"{self.base_url}/users/{username}/repos"
+        params = {
+            'type': 'public',
+            'sort': 'updated',
+            'per_page': per_page,
+            'page': 1
+        }
+
+        first_response = self._make_request_raw(url, params)
+        pages = [first_response.json()]
+
+        total_pages = self._last_page(first_response.headers.get('Link', ''))
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+                pages.extend(executor.map(
+                    lambda page: self._make_request(url, {**params, 'page': page}),
+                    range(2, total_pages + 1)
+                ))
+
         repositories = []
-        page = 1
-        
-        while True:
-            url = f"{self.base_url}/users/{username}/repos"
-            params = {
-                'type': 'public',
-                'sort': 'updated',
-                'per_page': per_page,
-                'page': page
-            }
-            
-            repos_data = self._make_request(url, params)
-            
-            if not repos_data:
-                break
-            
+        for repos_data in pages:
             for repo in repos_data:
                 repositories.append({
                     'name': repo['name'],
@@ -101,31 +257,198 @@ class GitHubAPIClient:
                     'html_url': repo['html_url'],
                     'topics': repo.get('topics', [])
                 })
-            
-            page += 1
-            
-            # Break if we got less than requested (last page)
-            if len(repos_data) < per_page:
-                break
-        
+
         return repositories
     
     def get_repository_languages(self, username: str, repo_name: str) -> Dict[str, int]:
         """Fetch language statistics for a specific repository"""
         url = f"{self.base_url}/repos/{username}/{repo_name}/languages"
-        
+
         try:
             return self._make_request(url)
+        except RateLimitExceeded:
+            # An exhausted budget must surface as a 429, not as a repo
+            # that silently has no languages
+            raise
         except Exception:
             # If languages endpoint fails, return empty dict
             return {}
 
+    def _make_graphql_request(self, query: str, variables: Dict) -> Dict:
+        """Make a request to the GitHub GraphQL API"""
+        url = f"{self.base_url}/graphql"
+
+        self._check_rate_budget()
+
+        try:
+            response = self.session.post(url, json={'query': query, 'variables': variables})
+            self._update_rate_budget(response)
+
+            self._raise_if_rate_limited(response)
+            response.raise_for_status()
+            payload = response.json()
+
+            if payload.get('errors'):
+                messages = '; '.join(error.get('message', 'unknown error') for error in payload['errors'])
+                raise Exception(f"GitHub GraphQL error: {messages}")
+
+            return payload['data']
+
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"GitHub API request failed: {str(e)}")
+
+    def fetch_user_graphql(self, username: str) -> Dict:
+        """Fetch user, repositories and languages in one GraphQL request per page
+
+        The REST flow costs 1 user call + one call per repo page + one
+        languages call per non-fork repo; GraphQL returns the same data in
+        ceil(repos/100) requests total.
+        """
+        query = """
+        query ($login: String!, $cursor: String) {
+          user(login: $login) {
+            login
+            name
+            bio
+            location
+            company
+            websiteUrl
+            email
+            followers { totalCount }
+            following { totalCount }
+            createdAt
+            updatedAt
+            avatarUrl
+            repositories(first: 100, after: $cursor, privacy: PUBLIC,
+                         ownerAffiliations: OWNER,
+                         orderBy: {field: UPDATED_AT, direction: DESC}) {
+              totalCount
+              pageInfo { endCursor hasNextPage }
+              nodes {
+                name
+                nameWithOwner
+                description
+                primaryLanguage { name }
+                stargazerCount
+                forkCount
+                watchers { totalCount }
+                diskUsage
+                isFork
+                isPrivate
+                createdAt
+                updatedAt
+                pushedAt
+                url
+                repositoryTopics(first: 20) { nodes { topic { name } } }
+                languages(first: 20) { edges { size node { name } } }
+              }
+            }
+          }
+        }
+        """
+
+        user_info = None
+        repositories = []
+        cursor = None
+
+        while True:
+            data = self._make_graphql_request(query, {'login': username, 'cursor': cursor})
+            user = data.get('user')
+
+            if not user:
+                raise Exception(f"User '{username}' not found")
+
+            if user_info is None:
+                user_info = {
+                    'login': user['login'],
+                    'name': user.get('name'),
+                    'bio': user.get('bio'),
+                    'location': user.get('location'),
+                    'company': user.get('company'),
+                    'blog': user.get('websiteUrl'),
+                    'email': user.get('email'),
+                    'public_repos': user['repositories']['totalCount'],
+                    'followers': user['followers']['totalCount'],
+                    'following': user['following']['totalCount'],
+                    'created_at': user['createdAt'],
+                    'updated_at': user['updatedAt'],
+                    'avatar_url': user['avatarUrl']
+                }
+
+            for repo in user['repositories']['nodes']:
+                primary_language = repo.get('primaryLanguage') or {}
+                repositories.append({
+                    'name': repo['name'],
+                    'full_name': repo['nameWithOwner'],
+                    'description': repo.get('description'),
+                    'language': primary_language.get('name'),
+                    'stars': repo['stargazerCount'],
+                    'forks': repo['forkCount'],
+                    'watchers': repo['watchers']['totalCount'],
+                    'size': repo['diskUsage'],
+                    'is_fork': repo['isFork'],
+                    'is_private': repo['isPrivate'],
+                    'created_at': repo['createdAt'],
+                    'updated_at': repo['updatedAt'],
+                    'pushed_at': repo.get('pushedAt'),
+                    'clone_url': f"{repo['url']}.git",
+                    'html_url': repo['url'],
+                    'topics': [node['topic']['name'] for node in repo['repositoryTopics']['nodes']],
+                    # Match the REST flow: languages only for original repos
+                    'languages': {} if repo['isFork'] else {
+                        edge['node']['name']: edge['size']
+                        for edge in repo['languages']['edges']
+                    }
+                })
+
+            page_info = user['repositories']['pageInfo']
+            if not page_info['hasNextPage']:
+                break
+            cursor = page_info['endCursor']
+
+        return {
+            'user': user_info,
+            'repositories': repositories
+        }
+
 def fetch_user_data(username: str) -> Dict:
     """Main function to fetch complete user data including repositories and languages"""
+    cache = get_cache()
+    cache_key = f"gh:user:{username}"
+
+    if cache is not None:
+        try:
+            cached = cache.get(cache_key)
+            if cached:
+                print(f"Using cached data for user: {username}")
+                return json.loads(cached)
+        except redis.RedisError as e:
+            print(f"Warning: Redis unavailable, skipping cache: {e}")
+
+    data = _fetch_user_data(username)
+
+    if cache is not None:
+        try:
+            cache.set(cache_key, json.dumps(data), ex=USER_CACHE_TTL)
+        except redis.RedisError as e:
+            print(f"Warning: Redis unavailable, user data not cached: {e}")
+
+    return data
+
+def _fetch_user_data(username: str) -> Dict:
+    """Fetch user data from the GitHub API (GraphQL when possible, else REST)"""
     client = GitHubAPIClient()
-    
+
     print(f"Fetching data for user: {username}")
-    
+
+    # GraphQL collapses the whole 1+N+M REST choreography into one request
+    # per repo page, but requires authentication
+    if Config.GITHUB_TOKEN:
+        data = client.fetch_user_graphql(username)
+        print(f"Found user: {data['user']['login']} ({data['user'].get('name', 'No name')})")
+        print(f"Found {len(data['repositories'])} repositories")
+        return data
+
     # Get user information
     user_info = client.get_user_info(username)
     print(f"Found user: {user_info['login']} ({user_info.get('name', 'No name')})")
@@ -134,17 +457,29 @@ def fetch_user_data(username: str) -> Dict:
     repositories = client.get_user_repositories(username)
     print(f"Found {len(repositories)} repositories")
     
-    # Get language data for each repository
+    # Get language data for each repository. The per-repo calls are
+    # independent and I/O-bound, so fetch them concurrently instead of
+    # paying one round-trip of latency per repository.
     for repo in repositories:
-        if not repo['is_fork']:  # Only get languages for original repos
+        repo['languages'] = {}
+
+    targets = [repo for repo in repositories if not repo['is_fork']]  # Only get languages for original repos
+
+    if targets:
+        def fetch_languages(repo):
             try:
-                languages = client.get_repository_languages(username, repo['name'])
-                repo['languages'] = languages
+                return client.get_repository_languages(username, repo['name'])
+            except RateLimitExceeded:
+                # Propagate so the analysis fails with a 429 instead of
+                # importing and caching incomplete data
+                raise
             except Exception as e:
                 print(f"Warning: Could not fetch languages for {repo['name']}: {e}")
-                repo['languages'] = {}
-        else:
-            repo['languages'] = {}
+                return {}
+
+        with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+            for repo, languages in zip(targets, executor.map(fetch_languages, targets)):
+                repo['languages'] = languages
     
     return {
         'user': user_info,
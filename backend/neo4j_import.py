@@ -1,237 +1,455 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, READ_ACCESS
 from typing import Dict, List
 from config import Config
+import asyncio
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# One driver per process: the Bolt driver owns a connection pool and is
+# designed to be long-lived, so sessions reuse warm connections instead of
+# paying a TCP/TLS handshake on every request
+_DRIVER = AsyncGraphDatabase.driver(
+    Config.NEO4J_URI,
+    auth=(Config.NEO4J_USERNAME, Config.NEO4J_PASSWORD),
+    max_connection_pool_size=50,
+    connection_acquisition_timeout=30,
+    connection_timeout=10,
+    keep_alive=True,
+    user_agent="github-neo4j-analyzer/1.0"
+)
+
+# Users with more repositories than this import via chunked
+# apoc.periodic.iterate commits instead of one fused transaction
+BULK_IMPORT_THRESHOLD = 500
+BULK_BATCH_SIZE = 5000
+
+async def close_driver():
+    """Close the shared driver; call once at application shutdown"""
+    await _DRIVER.close()
+
 class Neo4jImporter:
     """Neo4j database importer for GitHub user and repository data"""
-    
+
     def __init__(self):
-        self.driver = GraphDatabase.driver(
-            Config.NEO4J_URI,
-            auth=(Config.NEO4J_USERNAME, Config.NEO4J_PASSWORD)
-        )
-    
-    def close(self):
-        """Close the Neo4j driver connection"""
-        if self.driver:
-            self.driver.close()
-    
-    def __enter__(self):
+        self.driver = _DRIVER
+
+    async def close(self):
+        """No-op: the shared driver stays open for the process lifetime"""
+        pass
+
+    async def __aenter__(self):
         return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
-    
-    def clear_database(self):
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def clear_database(self):
         """Clear all nodes and relationships in the database"""
-        with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+        async def work(tx):
+            result = await tx.run("MATCH (n) DETACH DELETE n")
+            await result.consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(work)
             logger.info("Database cleared")
-    
-    def create_constraints(self):
+
+    async def create_constraints(self):
         """Create unique constraints for better performance and data integrity"""
         constraints = [
             "CREATE CONSTRAINT user_login IF NOT EXISTS FOR (u:User) REQUIRE u.login IS UNIQUE",
             "CREATE CONSTRAINT repo_full_name IF NOT EXISTS FOR (r:Repo) REQUIRE r.full_name IS UNIQUE",
-            "CREATE CONSTRAINT language_name IF NOT EXISTS FOR (l:Language) REQUIRE l.name IS UNIQUE"
+            "CREATE CONSTRAINT language_name IF NOT EXISTS FOR (l:Language) REQUIRE l.name IS UNIQUE",
+            # Composite index backing the fork-filtered, stars-ordered scans
+            "CREATE INDEX repo_fork_stars IF NOT EXISTS FOR (r:Repo) ON (r.is_fork, r.stars)"
         ]
-        
-        with self.driver.session() as session:
+
+        async with self.driver.session() as session:
             for constraint in constraints:
                 try:
-                    session.run(constraint)
+                    await session.run(constraint)
                     logger.info(f"Created constraint: {constraint}")
                 except Exception as e:
                     if "already exists" not in str(e).lower():
                         logger.warning(f"Failed to create constraint: {e}")
-    
-    def import_user(self, user_data: Dict) -> None:
+
+    async def import_user(self, user_data: Dict) -> None:
         """Import user data into Neo4j"""
+        # Only ship non-null properties; SET += leaves absent keys alone
+        # instead of writing explicit nulls for fields GitHub omitted
+        user_props = {k: v for k, v in user_data.items() if v is not None}
+
         query = """
         MERGE (u:User {login: $login})
-        SET u.name = $name,
-            u.bio = $bio,
-            u.location = $location,
-            u.company = $company,
-            u.blog = $blog,
-            u.email = $email,
-            u.public_repos = $public_repos,
-            u.followers = $followers,
-            u.following = $following,
-            u.created_at = $created_at,
-            u.updated_at = $updated_at,
-            u.avatar_url = $avatar_url,
+        SET u += $props,
             u.last_analyzed = datetime()
-        RETURN u
         """
-        
-        with self.driver.session() as session:
-            result = session.run(query, **user_data)
+
+        async def work(tx):
+            result = await tx.run(query, login=user_data['login'], props=user_props)
+            await result.consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(work)
             logger.info(f"Imported user: {user_data['login']}")
-            return result.single()
-    
-    def import_repository(self, repo_data: Dict, username: str) -> None:
+
+    async def import_repository(self, repo_data: Dict, username: str) -> None:
         """Import repository data and create relationship with user"""
         query = """
         MATCH (u:User {login: $username})
         MERGE (r:Repo {full_name: $full_name})
-        SET r.name = $name,
-            r.description = $description,
-            r.language = $language,
-            r.stars = $stars,
-            r.forks = $forks,
-            r.watchers = $watchers,
-            r.size = $size,
-            r.is_fork = $is_fork,
-            r.is_private = $is_private,
-            r.created_at = $created_at,
-            r.updated_at = $updated_at,
-            r.pushed_at = $pushed_at,
-            r.clone_url = $clone_url,
-            r.html_url = $html_url,
-            r.topics = $topics
+        SET r += $props
         MERGE (u)-[:OWNS]->(r)
-        RETURN r
         """
-        
-        with self.driver.session() as session:
-            repo_params = {**repo_data, 'username': username}
-            result = session.run(query, **repo_params)
+
+        repo_props = {k: v for k, v in repo_data.items() if v is not None}
+
+        async def work(tx):
+            result = await tx.run(
+                query,
+                username=username,
+                full_name=repo_data['full_name'],
+                props=repo_props
+            )
+            await result.consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(work)
             logger.info(f"Imported repository: {repo_data['full_name']}")
-            return result.single()
-    
-    def import_languages(self, repo_full_name: str, languages: Dict[str, int]) -> None:
+
+    async def import_languages(self, repo_full_name: str, languages: Dict[str, int]) -> None:
         """Import programming languages and create relationships with repository"""
         if not languages:
             return
-        
+
         # Calculate total bytes for percentage calculation
         total_bytes = sum(languages.values())
-        
-        for language, bytes_count in languages.items():
-            percentage = (bytes_count / total_bytes) * 100 if total_bytes > 0 else 0
-            
-            query = """
-            MATCH (r:Repo {full_name: $repo_full_name})
-            MERGE (l:Language {name: $language})
-            MERGE (r)-[rel:USES_LANGUAGE]->(l)
-            SET rel.bytes = $bytes_count,
-                rel.percentage = $percentage
-            RETURN l, rel
-            """
-            
-            with self.driver.session() as session:
-                session.run(query, {
-                    'repo_full_name': repo_full_name,
-                    'language': language,
-                    'bytes_count': bytes_count,
-                    'percentage': percentage
-                })
-        
+
+        # Send all languages as one parameter list and UNWIND server-side,
+        # so the whole batch is a single round-trip and a single commit
+        rows = [
+            {
+                'language': language,
+                'bytes_count': bytes_count,
+                'percentage': (bytes_count / total_bytes) * 100 if total_bytes > 0 else 0
+            }
+            for language, bytes_count in languages.items()
+        ]
+
+        query = """
+        MATCH (r:Repo {full_name: $repo_full_name})
+        UNWIND $rows AS row
+        MERGE (l:Language {name: row.language})
+        MERGE (r)-[rel:USES_LANGUAGE]->(l)
+        SET rel.bytes = row.bytes_count,
+            rel.percentage = row.percentage
+        """
+
+        async def work(tx):
+            result = await tx.run(query, repo_full_name=repo_full_name, rows=rows)
+            await result.consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(work)
+
         logger.info(f"Imported {len(languages)} languages for {repo_full_name}")
-    
-    def import_complete_user_data(self, data: Dict) -> None:
-        """Import complete user data including repositories and languages"""
+
+    async def import_repositories(self, repositories: List[Dict], username: str) -> None:
+        """Import a batch of repositories in a single UNWIND statement"""
+        if not repositories:
+            return
+
+        query = """
+        MATCH (u:User {login: $username})
+        UNWIND $repos AS repo
+        MERGE (r:Repo {full_name: repo.full_name})
+        SET r += repo
+        MERGE (u)-[:OWNS]->(r)
+        """
+
+        # Strip nested language maps (imported separately) and null values
+        repo_rows = [
+            {k: v for k, v in repo.items() if k != 'languages' and v is not None}
+            for repo in repositories
+        ]
+
+        async def work(tx):
+            result = await tx.run(query, username=username, repos=repo_rows)
+            await result.consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(work)
+
+        logger.info(f"Imported {len(repositories)} repositories for {username}")
+
+    async def import_complete_user_data_bulk(self, data: Dict) -> None:
+        """Import a large user payload in chunked transactions via APOC
+
+        A single fused transaction keeps the whole subgraph in transaction
+        state, which for users with thousands of repos can exhaust the
+        server heap. apoc.periodic.iterate commits in bounded batches
+        instead. Requires the APOC plugin.
+        """
         user_data = data['user']
         repositories = data['repositories']
-        
-        logger.info(f"Starting import for user: {user_data['login']}")
-        
-        # Import user
-        self.import_user(user_data)
-        
-        # Import repositories
+
+        logger.info(f"Starting bulk import for user: {user_data['login']}")
+
+        await self.import_user(user_data)
+
+        # Flatten to one row per (repo, language); repos without language
+        # data get a single row with language NULL
+        rows = []
         for repo in repositories:
-            self.import_repository(repo, user_data['login'])
-            
-            # Import languages for this repository
-            if 'languages' in repo and repo['languages']:
-                self.import_languages(repo['full_name'], repo['languages'])
-        
-        logger.info(f"Completed import for user: {user_data['login']}")
-    
-    def get_user_stats(self, username: str) -> Dict:
-        """Get comprehensive stats for a user from Neo4j"""
+            repo_props = {k: v for k, v in repo.items() if k != 'languages' and v is not None}
+            languages = repo.get('languages', {})
+            total = sum(languages.values())
+
+            if not languages:
+                rows.append({
+                    'repo_full_name': repo['full_name'],
+                    'repo_props': repo_props,
+                    'language': None,
+                    'bytes': 0,
+                    'percentage': 0
+                })
+                continue
+
+            for name, bytes_count in languages.items():
+                rows.append({
+                    'repo_full_name': repo['full_name'],
+                    'repo_props': repo_props,
+                    'language': name,
+                    'bytes': bytes_count,
+                    'percentage': (bytes_count / total) * 100 if total > 0 else 0
+                })
+
+        query = """
+        CALL apoc.periodic.iterate(
+            'UNWIND $rows AS row RETURN row',
+            'MATCH (u:User {login: $login})
+             MERGE (r:Repo {full_name: row.repo_full_name})
+             SET r += row.repo_props
+             MERGE (u)-[:OWNS]->(r)
+             FOREACH (_ IN CASE WHEN row.language IS NULL THEN [] ELSE [1] END |
+                 MERGE (l:Language {name: row.language})
+                 MERGE (r)-[rel:USES_LANGUAGE]->(l)
+                 SET rel.bytes = row.bytes, rel.percentage = row.percentage)',
+            {batchSize: $batch_size, parallel: false,
+             params: {rows: $rows, login: $login}})
+        """
+
+        async def work(tx):
+            result = await tx.run(
+                query,
+                rows=rows,
+                login=user_data['login'],
+                batch_size=BULK_BATCH_SIZE
+            )
+            await result.consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(work)
+
+        logger.info(f"Completed bulk import for user: {user_data['login']} "
+                    f"({len(repositories)} repositories, {len(rows)} rows)")
+
+    async def import_complete_user_data(self, data: Dict) -> Dict:
+        """Import complete user data including repositories and languages
+
+        The whole payload goes to the server as one statement that UNWINDs
+        the nested repo/language arrays, so the entire subgraph is built in
+        a single transaction and a single commit instead of one round-trip
+        per user, repo and language batch. Very large payloads take the
+        chunked APOC path to keep transaction memory bounded.
+
+        Returns the freshly written user stats and top repositories, so
+        callers don't need follow-up read transactions for data the import
+        just produced.
+        """
+        user_data = data['user']
+        repositories = data['repositories']
+
+        if len(repositories) > BULK_IMPORT_THRESHOLD:
+            await self.import_complete_user_data_bulk(data)
+            return {
+                'user_stats': await self.get_user_stats(user_data['login']),
+                'top_repositories': await self.get_top_repositories(user_data['login'])
+            }
+
+        logger.info(f"Starting import for user: {user_data['login']}")
+
+        user_props = {k: v for k, v in user_data.items() if v is not None}
+
+        repo_rows = [
+            {
+                'repo': {k: v for k, v in repo.items()
+                         if k != 'languages' and v is not None},
+                'languages': [
+                    {'name': name, 'bytes': bytes_count}
+                    for name, bytes_count in repo.get('languages', {}).items()
+                ]
+            }
+            for repo in repositories
+        ]
+
         query = """
+        MERGE (u:User {login: $user.login})
+        SET u += $user,
+            u.last_analyzed = datetime()
+        WITH u
+        CALL {
+            WITH u
+            UNWIND $repos AS row
+            MERGE (r:Repo {full_name: row.repo.full_name})
+            SET r += row.repo
+            MERGE (u)-[:OWNS]->(r)
+            WITH r, row, reduce(s = 0, l IN row.languages | s + l.bytes) AS total
+            UNWIND row.languages AS l
+            MERGE (lang:Language {name: l.name})
+            MERGE (r)-[rel:USES_LANGUAGE]->(lang)
+            SET rel.bytes = l.bytes,
+                rel.percentage = CASE WHEN total > 0 THEN 100.0 * l.bytes / total ELSE 0 END
+            RETURN count(*) AS imported_rows
+        }
+        CALL {
+            WITH u
+            MATCH (u)-[:OWNS]->(r:Repo)
+            RETURN count(r) AS repos_analyzed,
+                   collect(r {
+                       .name, .full_name, .description, .stars,
+                       .forks, .language, .is_fork, .topics
+                   }) AS repositories
+        }
+        CALL {
+            WITH u
+            MATCH (u)-[:OWNS]->(:Repo)-[rel:USES_LANGUAGE]->(l:Language)
+            WITH l.name AS language,
+                 sum(rel.bytes) AS total_bytes,
+                 count(rel) AS repo_count,
+                 avg(rel.percentage) AS avg_percentage
+            RETURN collect({
+                language: language, total_bytes: total_bytes,
+                repo_count: repo_count, avg_percentage: avg_percentage
+            }) AS language_rows
+        }
+        CALL {
+            WITH u
+            MATCH (u)-[:OWNS]->(r:Repo)
+            WHERE NOT r.is_fork
+            WITH r
+            ORDER BY r.stars DESC
+            LIMIT 10
+            RETURN collect(r {
+                .name, .full_name, .description, .stars,
+                .forks, .language, url: r.html_url
+            }) AS top_repositories
+        }
+        RETURN u.login AS username,
+               u.name AS name,
+               u.public_repos AS total_repos_github,
+               repos_analyzed,
+               repositories,
+               language_rows,
+               top_repositories
+        """
+
+        async def work(tx):
+            result = await tx.run(query, user=user_props, repos=repo_rows)
+            return await result.single()
+
+        async with self.driver.session() as session:
+            record = await session.execute_write(work)
+
+        logger.info(f"Completed import for user: {user_data['login']} "
+                    f"({len(repositories)} repositories in one transaction)")
+
+        return {
+            'user_stats': {
+                'username': record['username'],
+                'name': record['name'],
+                'total_repos_github': record['total_repos_github'],
+                'repos_analyzed': record['repos_analyzed'],
+                'repositories': record['repositories'],
+                'language_stats': {
+                    row['language']: {
+                        'total_bytes': row['total_bytes'],
+                        'repo_count': row['repo_count'],
+                        'avg_percentage': row['avg_percentage']
+                    }
+                    for row in record['language_rows']
+                }
+            },
+            'top_repositories': record['top_repositories']
+        }
+
+    async def get_user_stats(self, username: str) -> Dict:
+        """Get comprehensive stats for a user from Neo4j
+
+        Aggregation happens server-side: the first query collects the repo
+        list, the second returns one pre-aggregated row per language, so
+        the driver never ships the full (repo, language) Cartesian product.
+        """
+        user_query = """
         MATCH (u:User {login: $username})
         OPTIONAL MATCH (u)-[:OWNS]->(r:Repo)
-        OPTIONAL MATCH (r)-[rel:USES_LANGUAGE]->(l:Language)
-        
-        WITH u, r, l, rel
-        
         RETURN u.login as username,
                u.name as name,
                u.public_repos as total_repos_github,
-               count(DISTINCT r) as repos_analyzed,
-               collect(DISTINCT {
-                   name: r.name,
-                   full_name: r.full_name,
-                   description: r.description,
-                   stars: r.stars,
-                   forks: r.forks,
-                   language: r.language,
-                   is_fork: r.is_fork,
-                   topics: r.topics
-               }) as repositories,
-               collect(DISTINCT {
-                   language: l.name,
-                   percentage: rel.percentage,
-                   bytes: rel.bytes
-               }) as languages
+               count(r) as repos_analyzed,
+               collect(r {
+                   .name, .full_name, .description, .stars,
+                   .forks, .language, .is_fork, .topics
+               }) as repositories
+        """
+
+        language_query = """
+        MATCH (:User {login: $username})-[:OWNS]->(:Repo)-[rel:USES_LANGUAGE]->(l:Language)
+        RETURN l.name as language,
+               sum(rel.bytes) as total_bytes,
+               count(rel) as repo_count,
+               avg(rel.percentage) as avg_percentage
         """
-        
-        with self.driver.session() as session:
-            result = session.run(query, username=username)
-            record = result.single()
-            
+
+        async def work(tx):
+            result = await tx.run(user_query, username=username)
+            record = await result.single()
+
             if not record:
                 return None
-            
-            # Process language statistics
-            languages = [lang for lang in record['languages'] if lang['language']]
-            language_stats = {}
-            
-            for lang in languages:
-                lang_name = lang['language']
-                if lang_name not in language_stats:
-                    language_stats[lang_name] = {
-                        'total_bytes': 0,
-                        'repo_count': 0,
-                        'avg_percentage': 0
-                    }
-                
-                language_stats[lang_name]['total_bytes'] += lang.get('bytes', 0)
-                language_stats[lang_name]['repo_count'] += 1
-            
-            # Calculate average percentages
-            for lang_name, stats in language_stats.items():
-                if stats['repo_count'] > 0:
-                    lang_percentages = [
-                        lang['percentage'] for lang in languages 
-                        if lang['language'] == lang_name and lang.get('percentage')
-                    ]
-                    if lang_percentages:
-                        stats['avg_percentage'] = sum(lang_percentages) / len(lang_percentages)
-            
+
+            result = await tx.run(language_query, username=username)
+            language_stats = {
+                lang['language']: {
+                    'total_bytes': lang['total_bytes'],
+                    'repo_count': lang['repo_count'],
+                    'avg_percentage': lang['avg_percentage']
+                }
+                async for lang in result
+            }
+
             return {
                 'username': record['username'],
                 'name': record['name'],
                 'total_repos_github': record['total_repos_github'],
                 'repos_analyzed': record['repos_analyzed'],
-                'repositories': [repo for repo in record['repositories'] if repo['name']],
+                'repositories': record['repositories'],
                 'language_stats': language_stats
             }
-    
-    def get_top_repositories(self, username: str, limit: int = 10) -> List[Dict]:
+
+        async with self.driver.session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(work)
+
+    async def get_top_repositories(self, username: str, limit: int = 10) -> List[Dict]:
         """Get top repositories by stars for a user"""
         query = """
         MATCH (u:User {login: $username})-[:OWNS]->(r:Repo)
         WHERE NOT r.is_fork
+        WITH r
+        ORDER BY r.stars DESC
+        LIMIT $limit
         RETURN r.name as name,
                r.full_name as full_name,
                r.description as description,
@@ -239,49 +457,58 @@ class Neo4jImporter:
                r.forks as forks,
                r.language as language,
                r.html_url as url
-        ORDER BY r.stars DESC
-        LIMIT $limit
         """
-        
-        with self.driver.session() as session:
-            result = session.run(query, username=username, limit=limit)
-            return [record.data() for record in result]
 
-def import_github_user(username: str, github_data: Dict = None) -> None:
-    """Main function to import GitHub user data into Neo4j"""
+        async def work(tx):
+            result = await tx.run(query, username=username, limit=limit)
+            return [record.data() async for record in result]
+
+        async with self.driver.session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(work)
+
+async def import_github_user(username: str, github_data: Dict = None) -> Dict:
+    """Main function to import GitHub user data into Neo4j
+
+    Returns the imported user's stats and top repositories as produced by
+    the import transaction itself.
+    """
     try:
         Config.validate_config()
-        
-        with Neo4jImporter() as importer:
-            # Create constraints for better performance
-            importer.create_constraints()
-            
-            # If no data provided, fetch it
+
+        async with Neo4jImporter() as importer:
+            # If no data provided, fetch it (blocking HTTP, so off the loop)
             if not github_data:
                 from fetch_github import fetch_user_data
-                github_data = fetch_user_data(username)
-            
+                github_data = await asyncio.to_thread(fetch_user_data, username)
+
             # Import the data
-            importer.import_complete_user_data(github_data)
-            
+            result = await importer.import_complete_user_data(github_data)
+
             logger.info(f"Successfully imported data for {username}")
-            
+            return result
+
     except Exception as e:
         logger.error(f"Failed to import data for {username}: {e}")
         raise
 
 if __name__ == "__main__":
     import sys
-    
+
     if len(sys.argv) != 2:
         print("Usage: python neo4j_import.py <username>")
         sys.exit(1)
-    
+
     username = sys.argv[1]
-    
+
+    async def main():
+        # One-shot CLI run: ensure constraints exist before importing
+        async with Neo4jImporter() as importer:
+            await importer.create_constraints()
+        await import_github_user(username)
+
     try:
-        import_github_user(username)
+        asyncio.run(main())
         print(f"Successfully imported data for {username}")
     except Exception as e:
         print(f"Error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
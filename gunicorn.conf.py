@@ -1,15 +1,23 @@
+import multiprocessing
 import os
 
 # Gunicorn configuration for Render deployment
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
-workers = 1  # Reduced for free tier
-worker_class = "sync"
+# Standard sizing for I/O-bound services; WEB_CONCURRENCY overrides it on
+# memory-constrained tiers
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', max(2, multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 100
 timeout = 120  # Increased timeout
 keepalive = 2
-preload_app = True
+# Must stay off: importing the app creates the module-level async Neo4j
+# driver in neo4j_import, and a driver created pre-fork would share its
+# connection pool and event loop across forked workers
+preload_app = False
 
 # Logging
 accesslog = "-"
@@ -21,7 +29,6 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 proc_name = "github-analyzer-api"
 
 # Memory management for free tier
-max_requests_jitter = 50
 worker_tmp_dir = "/dev/shm"
 
 # Worker processes
@@ -31,8 +38,5 @@ def when_ready(server):
 def worker_int(worker):
     worker.log.info("worker received INT or QUIT signal")
 
-def pre_fork(server, worker):
-    server.log.info("Worker spawned (pid: %s)", worker.pid)
-
 def post_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
\ No newline at end of file